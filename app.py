@@ -1,19 +1,14 @@
 import streamlit as st
-from openai import OpenAI
-import requests
-from github import Github
 from dotenv import load_dotenv
 import os
 import time
 import re
 import uuid
+import secrets
 import ast
+import itertools
 import base64
-from pyairtable import Table
-import nacl.encoding
-import nacl.public
-import nacl.signing
-import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables from .env file
 load_dotenv()
@@ -38,11 +33,67 @@ for secret in required_secrets:
         st.error(f"{secret} not found. Please set the corresponding environment variable.")
         st.stop()
 
-# Initialize OpenAI client
-client = OpenAI(api_key=openai_api_key)
-
-# Initialize Airtable client
-airtable = Table(airtable_api_key, airtable_base_id, airtable_table_name)
+# Clients are cached so their HTTP connection pools survive Streamlit reruns.
+# The SDKs are imported on first use so the page renders without loading them.
+@st.cache_resource
+def get_openai_client():
+    from openai import OpenAI
+    # The SDK already backs off on 429 and 5xx responses; allow more attempts before surfacing an error
+    return OpenAI(api_key=openai_api_key, max_retries=5)
+
+@st.cache_resource
+def get_github():
+    from github import Github
+    return Github(github_token)
+
+@st.cache_resource
+def get_airtable():
+    from pyairtable import Table
+    return Table(airtable_api_key, airtable_base_id, airtable_table_name)
+
+# Shared pool for short work that outlives a single rerun (Airtable writes, webhook posts)
+@st.cache_resource
+def get_background_executor():
+    return ThreadPoolExecutor(max_workers=8)
+
+# Release waits hold a thread for minutes, so they get their own pool and cannot starve the writes
+@st.cache_resource
+def get_release_executor():
+    return ThreadPoolExecutor(max_workers=8)
+
+# Shared sessions for the raw GitHub, Heroku and Make calls so TLS connections are kept alive.
+# They are looked up on the script thread and passed to the helpers that run on worker threads.
+HTTP_TIMEOUT = (3.05, 15)  # connect, read
+
+def new_http_session(headers=None):
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    session = requests.Session()
+    # Bounded connection pool; idempotent requests are retried on rate limits and gateway errors
+    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=retries))
+    session.headers.update(headers or {})
+    return session
+
+@st.cache_resource
+def get_http_session():
+    return new_http_session()
+
+@st.cache_resource
+def get_github_session():
+    return new_http_session({
+        "Authorization": f"Bearer {github_token}",
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28",
+    })
+
+@st.cache_resource
+def get_heroku_session():
+    return new_http_session({
+        "Authorization": f"Bearer {heroku_api_key}",
+        "Accept": "application/vnd.heroku+json; version=3",
+    })
 
 # Set page configuration
 st.set_page_config(
@@ -63,34 +114,429 @@ with st.form("app_idea_form"):
     app_type = st.selectbox("Choose the app type", ["Streamlit", "React"])
     submitted = st.form_submit_button("Generate App Code")
 
+# Top-level import name -> package name on PyPI
+BASE_REQUIREMENTS = {
+    'streamlit': 'streamlit',
+    'openai': 'openai',
+    'requests': 'requests',
+    'github': 'PyGithub',
+    'dotenv': 'python-dotenv',
+    'nacl': 'pynacl',
+    'plotly': 'plotly',
+    'pyairtable': 'pyairtable'
+}
+
+# One module per import line; anything else (e.g. "import a, b") falls back to the AST
+_IMPORT_LINE_RE = re.compile(r'^[ \t]*(?:import|from)[ \t]', re.MULTILINE)
+# "try: import x" or "a = 1; import x" puts an import after the start of the line, where the two above never look
+_COMPOUND_IMPORT_RE = re.compile(r'^[^#\n]*[:;][ \t]*(?:import|from)[ \t]', re.MULTILINE)
+_SIMPLE_IMPORT_RE = re.compile(
+    r'^[ \t]*(?:import[ \t]+([\w.]+)(?:[ \t]+as[ \t]+\w+)?[ \t]*$|from[ \t]+([\w.]+)[ \t]+import\b)', re.MULTILINE
+)
+
 def extract_imports(code):
+    # Fast path: every import line is a simple one, so the regex captures all of them.
+    # A triple-quoted string can hold lines that only look like imports, and a compound statement
+    # can hide one mid-line, so both go to the AST.
+    simple_imports = _SIMPLE_IMPORT_RE.findall(code)
+    if (
+        '"""' not in code and "'''" not in code and not _COMPOUND_IMPORT_RE.search(code)
+        and len(simple_imports) == len(_IMPORT_LINE_RE.findall(code))
+    ):
+        modules = (module or package for module, package in simple_imports)
+        return {module.split('.')[0] for module in modules if not module.startswith('.')}
+
     tree = ast.parse(code)
-    imports = set()
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                imports.add(alias.name.split('.')[0])
-        elif isinstance(node, ast.ImportFrom):
-            imports.add(node.module.split('.')[0])
-    return list(imports)
+    modules = itertools.chain.from_iterable(
+        (alias.name for alias in node.names) if isinstance(node, ast.Import) else (node.module,)
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Import) or (isinstance(node, ast.ImportFrom) and node.module and not node.level)
+    )
+    return {module.split('.')[0] for module in modules}
 
 def generate_requirements(imports):
-    base_requirements = {
-        'streamlit': 'streamlit',
-        'openai': 'openai',
-        'requests': 'requests',
-        'github': 'PyGithub',
-        'dotenv': 'python-dotenv',
-        'nacl': 'pynacl',
-        'plotly': 'plotly',
-        'pyairtable': 'pyairtable'
-    }
-    return "\n".join([base_requirements.get(lib, lib) for lib in imports if lib in base_requirements])
+    return "\n".join([BASE_REQUIREMENTS[lib] for lib in imports if lib in BASE_REQUIREMENTS])
+
+# Parse the generated code once per unique code string
+@st.cache_data(show_spinner=False)
+def build_requirements(code):
+    # The app always runs under Streamlit; sorting keeps requirements.txt stable across processes
+    return generate_requirements(sorted(extract_imports(code) | {'streamlit'}))
+
+# The instructions are identical for every idea, so they form a fixed system prefix that the
+# provider can cache; only the idea itself varies, as the last message.
+STREAMLIT_SYSTEM_PROMPT = (
+    "You are a helpful assistant. Generate a Streamlit app for the idea the user describes. "
+    "Make sure there are no errors, it has to be modern looking, include relevant icons and add CSS to make it look modern and sleek usable application. "
+    "If data is needed then, create an input box for the user to enter their own OpenAI API key and use openai.chat.completions.create and gpt-4 model with the structure: "
+    "response = openai.chat.completions.create(model='gpt-4', messages=[{'role': 'system', 'content': 'You are a helpful assistant.'}, {'role': 'user', 'content': 'give me all the food festivals near '}]). "
+    "Use message_content = response.choices[0].message.content.strip() instead of message_content = response.choices[0].message['content'].strip()."
+)
 
-def create_zip_file(files, zip_filename="react-app.zip"):
-    with zipfile.ZipFile(zip_filename, 'w') as zipf:
-        for file_name, file_content in files.items():
-            zipf.writestr(file_name, file_content)
+# Identical prompts are answered from the cache instead of calling the model again.
+# Tokens are streamed into a placeholder as they arrive and the stream is closed at the
+# closing fence, since nothing after the code block is used.
+@st.cache_data(ttl=86400, max_entries=64, show_spinner=False)
+def generate_code(app_prompt, model="gpt-4"):
+    stream = get_openai_client().chat.completions.create(
+        model=model,
+        stream=True,
+        messages=[
+            {"role": "system", "content": STREAMLIT_SYSTEM_PROMPT},
+            {"role": "user", "content": app_prompt}
+        ]
+    )
+    placeholder = st.empty()
+    message_content = ""
+    code_start = -1
+    for chunk_count, chunk in enumerate(stream, 1):
+        if not chunk.choices:
+            continue
+        previous_length = len(message_content)
+        message_content += chunk.choices[0].delta.content or ""
+        # Only the tail that could hold a fence split across chunks is searched
+        if code_start < 0:
+            fence = message_content.find("```python\n", max(0, previous_length - 9))
+            if fence < 0:
+                continue
+            code_start = fence + len("```python\n")
+        if message_content.find("\n```", max(code_start, previous_length - 3)) >= 0:
+            stream.close()
+            break
+        # Redrawing the whole block on every token is wasted work; every 50 chunks keeps it live
+        if chunk_count % 50 == 0:
+            placeholder.code(message_content[code_start:], language='python')
+
+    code_end = message_content.find("\n```", code_start) if code_start >= 0 else -1
+    if code_end < 0:
+        raise ValueError("The model response did not contain a complete ```python code block.")
+    code_block = message_content[code_start:code_end]
+    placeholder.code(code_block, language='python')
+    return code_block
+
+# React apps come back as a base64 zip; cached the same way as the Streamlit code
+_BASE64_BLOCK_RE = re.compile(r'```base64\n(.*?)\n```', re.DOTALL)
+
+@st.cache_data(ttl=86400, max_entries=64, show_spinner=False)
+def generate_react_app(app_prompt, model="gpt-4"):
+    response = get_openai_client().chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": f"Generate a React app for the following idea:\n{app_prompt}. The code should be structured with multiple pages, and it should be modern looking with relevant icons and CSS to make it look sleek and usable. The code should be delivered in a zip file so that I can run 'npm install' and 'npm run' to start the app."}
+        ]
+    )
+    message_content = response.choices[0].message.content.strip()
+    code_base64 = _BASE64_BLOCK_RE.search(message_content).group(1)
+    return base64.b64decode(code_base64)
+
+def github_request(session, method, path, **kwargs):
+    response = session.request(method, f"https://api.github.com/{path}", timeout=HTTP_TIMEOUT, **kwargs)
+    response.raise_for_status()
+    # Decode the body once here; 204 responses (dispatches, secrets) have none
+    return response.json() if response.content else None
+
+def commit_files(session, repo, files, message):
+    # Push all files as one commit through the Git Data API: one tree, one commit, one ref update
+    git_path = f"repos/{repo.full_name}/git"
+    branch = repo.default_branch
+    # The branch endpoint returns the head commit and its tree SHA in one request
+    head = github_request(session, "GET", f"repos/{repo.full_name}/branches/{branch}")["commit"]
+    parent_sha = head["sha"]
+    parent_tree_sha = head["commit"]["tree"]["sha"]
+
+    # Contents go inline in the tree request; GitHub creates the blobs itself
+    elements = [
+        {"path": file_name, "mode": "100755" if file_name.endswith(".sh") else "100644", "type": "blob", "content": content}
+        for file_name, content in files
+    ]
+    tree = github_request(session, "POST", f"{git_path}/trees", json={"base_tree": parent_tree_sha, "tree": elements})
+    commit = github_request(
+        session, "POST", f"{git_path}/commits", json={"message": message, "tree": tree["sha"], "parents": [parent_sha]}
+    )
+    github_request(session, "PATCH", f"{git_path}/refs/heads/{branch}", json={"sha": commit["sha"]})
+    return commit
+
+def dispatch_workflow(session, repo, workflow_file, attempts=4):
+    # One workflow_dispatch event; needs "on: workflow_dispatch" in the workflow.
+    # Returns the dispatch time (a few seconds early for clock skew) to find the run it starts.
+    import requests
+    dispatched_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - 5))
+    dispatches_path = f"repos/{repo.full_name}/actions/workflows/{workflow_file}/dispatches"
+    for attempt in range(attempts):
+        try:
+            github_request(session, "POST", dispatches_path, json={"ref": repo.default_branch})
+            return dispatched_at
+        except requests.HTTPError as e:
+            # A workflow committed moments ago can answer 404/422 until GitHub has registered it
+            if e.response.status_code not in (404, 422) or attempt == attempts - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+def latest_workflow_run(session, repo_full_name, workflow_file, created_after):
+    # Newest dispatched run of the workflow started since created_after, or None before it shows up
+    runs = github_request(
+        session, "GET", f"repos/{repo_full_name}/actions/workflows/{workflow_file}/runs",
+        params={"event": "workflow_dispatch", "created": f">={created_after}", "per_page": 1},
+    )["workflow_runs"]
+    return runs[0] if runs else None
+
+def set_repo_variable(session, repo_full_name, name, value):
+    # Create the Actions variable, or update it when an earlier attempt already created it
+    import requests
+    variables_path = f"repos/{repo_full_name}/actions/variables"
+    try:
+        github_request(session, "POST", variables_path, json={"name": name, "value": value})
+    except requests.HTTPError as e:
+        if e.response.status_code != 409:
+            raise
+        github_request(session, "PATCH", f"{variables_path}/{name}", json={"name": name, "value": value})
+
+def sealed_box_for(public_key):
+    import nacl.encoding
+    import nacl.public
+    return nacl.public.SealedBox(nacl.public.PublicKey(public_key.encode("ascii"), nacl.encoding.Base64Encoder))
+
+def encrypt_secret(sealed_box, secret_value):
+    import nacl.encoding
+    # libsodium returns the ciphertext already base64-encoded
+    return sealed_box.encrypt(secret_value.encode("utf-8"), encoder=nacl.encoding.Base64Encoder).decode("ascii")
+
+def push_secrets(session, repo_full_name, secret_values):
+    # Fetch the repository public key and build its sealed box once, then create every Actions secret concurrently
+    secrets_path = f"repos/{repo_full_name}/actions/secrets"
+    public_key_data = github_request(session, "GET", f"{secrets_path}/public-key")
+    sealed_box = sealed_box_for(public_key_data["key"])
+
+    def put_secret(name, value):
+        payload = {
+            "encrypted_value": encrypt_secret(sealed_box, value),
+            "key_id": public_key_data["key_id"]
+        }
+        github_request(session, "PUT", f"{secrets_path}/{name}", json=payload)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        list(executor.map(put_secret, secret_values.keys(), secret_values.values()))
+
+# Static scaffolding committed next to the generated app.py
+PROCFILE = "web: streamlit run app.py"
+
+SETUP_SH = """\
+mkdir -p ~/.streamlit/
+echo "\\
+[server]\\n\\
+headless = true\\n\\
+port = $PORT\\n\\
+enableCORS = false\\n\\
+\\n\\
+" > ~/.streamlit/config.toml
+chmod +x setup.sh
+"""
+
+DOCKERFILE = """\
+# Use the official Python image from the Docker Hub
+FROM python:3.11-slim
+
+# Set the working directory in the container
+WORKDIR /app
+
+# Copy the requirements file into the container
+COPY requirements.txt .
+
+# Install the dependencies
+RUN pip install --no-cache-dir -r requirements.txt
+
+# Copy the rest of the application code into the container
+COPY . .
+
+# Expose the port that Streamlit will run on
+EXPOSE 8000
+
+# Add execute permissions to the entrypoint script
+RUN chmod +x entrypoint.sh
+
+# Specify the entrypoint script
+ENTRYPOINT ["./entrypoint.sh"]
+"""
+
+ENTRYPOINT_SH = """\
+#!/bin/bash
+# Set the Streamlit server port to the value of the PORT environment variable
+export STREAMLIT_SERVER_PORT=${PORT}
+
+# Run Streamlit with the specified port
+streamlit run app.py --server.port=${PORT} --server.address=0.0.0.0
+"""
+
+HEROKU_YML = """\
+build:
+  docker:
+    web: Dockerfile
+
+run:
+  web: ./entrypoint.sh
+"""
+
+# Workflow that builds the container and releases it to the Heroku app. The app name comes from
+# the HEROKU_APP_NAME repo variable, so the file is the same for every deploy; runs before the
+# variable is set (the push of the initial commit) are skipped.
+ACTION_YML = """\
+name: Deploy to Heroku
+
+on:
+  workflow_dispatch:
+
+jobs:
+  build-and-deploy:
+    runs-on: ubuntu-latest
+
+    steps:
+      - name: Checkout code
+        uses: actions/checkout@v3
+
+      - name: Set up Docker Buildx
+        uses: docker/setup-buildx-action@v2
+
+      - name: Login to Heroku Container Registry
+        run: echo "${{ secrets.HEROKU_API_KEY }}" | docker login --username=_ --password-stdin registry.heroku.com
+
+      - name: Build Docker image
+        run: docker build -t registry.heroku.com/${{ vars.HEROKU_APP_NAME }}/web .
+
+      - name: Push Docker image to Heroku
+        run: docker push registry.heroku.com/${{ vars.HEROKU_APP_NAME }}/web
+
+      - name: Release app
+        run: |
+          heroku container:release web --app ${{ vars.HEROKU_APP_NAME }}
+        env:
+          HEROKU_API_KEY: ${{ secrets.HEROKU_API_KEY }}
+"""
+
+# Generated app plus the static scaffolding, as (path, content) pairs
+def build_deploy_files(code_block, requirements):
+    return [
+        ("app.py", code_block),
+        ("requirements.txt", requirements),
+        ("Procfile", PROCFILE),
+        ("setup.sh", SETUP_SH),
+        ("Dockerfile", DOCKERFILE),
+        ("entrypoint.sh", ENTRYPOINT_SH),
+        ("heroku.yml", HEROKU_YML),
+        (".github/workflows/main.yml", ACTION_YML),
+    ]
+
+_HEROKU_NAME_RE = re.compile(r'[^a-z0-9-]')
+
+def create_heroku_app(session, repo_full_name):
+    # Generate a valid and unique Heroku app name
+    heroku_app_name_base = _HEROKU_NAME_RE.sub('', repo_full_name.lower())[:20].strip('-')
+    unique_suffix = secrets.token_hex(4)
+    heroku_app_name = f"{heroku_app_name_base}-{unique_suffix}"
+    payload = {
+        "name": heroku_app_name,
+        "stack": "container"
+    }
+    response = session.post("https://api.heroku.com/apps", json=payload, timeout=HTTP_TIMEOUT)
+    app_data = response.json()
+    if response.status_code != 201:
+        raise RuntimeError(f"Failed to create Heroku app: {app_data}")
+    return app_data["name"]
+
+def latest_heroku_release(session, app_name):
+    # Only the newest release, via Heroku's Range header
+    response = session.get(
+        f"https://api.heroku.com/apps/{app_name}/releases",
+        headers={"Range": "version ..; order=desc, max=1"},
+        timeout=HTTP_TIMEOUT,
+    )
+    response.raise_for_status()
+    releases = response.json()
+    return releases[0] if releases else None
+
+def wait_for_heroku_release(heroku_session, github_session, app_name, after_version, repo_full_name, dispatched_at, timeout=300):
+    # Poll with backoff until a release newer than after_version finishes; None on timeout.
+    # A workflow run that fails before releasing (e.g. a broken build) counts as a failed release.
+    deadline = time.monotonic() + timeout
+    delay = 2
+    while time.monotonic() < deadline:
+        release = latest_heroku_release(heroku_session, app_name)
+        if release and release["version"] > after_version and release["status"] in ("succeeded", "failed"):
+            return release["status"]
+        run = latest_workflow_run(github_session, repo_full_name, "main.yml", dispatched_at)
+        if run and run["status"] == "completed" and run["conclusion"] != "success":
+            return "failed"
+        time.sleep(delay)
+        delay = min(delay * 2, 10)
+    return None
+
+def queue_airtable_row(row):
+    # One row is queued per submission, so it is written straight away (with any requeued rows)
+    # rather than held back for a 10-row batch that would never fill
+    st.session_state.setdefault('pending_airtable_rows', []).append(row)
+    flush_airtable_rows()
+
+def flush_airtable_rows():
+    # Write the queued rows on a background thread so the page does not wait on Airtable
+    check_airtable_writes()
+    rows = st.session_state.get('pending_airtable_rows')
+    if rows:
+        st.session_state['pending_airtable_rows'] = []
+        future = get_background_executor().submit(get_airtable().batch_create, rows)
+        st.session_state.setdefault('airtable_writes', []).append((future, rows))
+
+def check_airtable_writes():
+    # Drop finished writes; rows from failed ones go back on the queue for the next rerun's retry
+    running = []
+    for future, rows in st.session_state.get('airtable_writes', []):
+        if not future.done():
+            running.append((future, rows))
+        elif future.exception():
+            st.session_state.setdefault('pending_airtable_rows', []).extend(rows)
+            st.error(f"Error saving to Airtable: {future.exception()}")
+            print(f"Error saving to Airtable: {future.exception()}")
+        elif rows:
+            # Keep the ids Airtable assigned so later updates can address the rows directly
+            record_ids = st.session_state.setdefault('airtable_record_ids', {})
+            for record in future.result():
+                record_ids[record['fields']['unique_id']] = record['id']
+    st.session_state['airtable_writes'] = running
+    return not running
+
+def mark_airtable_done(table, unique_id, record_id=None, creates=()):
+    # Wait for the row's create if it is still in flight; its result supplies the record id
+    for create in creates:
+        try:
+            records = create.result()
+        except Exception as e:
+            raise RuntimeError(f"row {unique_id} was not created, so it stays In progress: {e}")
+        for record in records:
+            if record['fields']['unique_id'] == unique_id:
+                record_id = record['id']
+    # Update by record id when the create told us one; otherwise upsert keyed on unique_id
+    if record_id:
+        table.update(record_id, {"Status": "Done"})
+    else:
+        table.batch_upsert([{"fields": {"unique_id": unique_id, "Status": "Done"}}], key_fields=["unique_id"])
+
+def queue_airtable_done(unique_id):
+    # The Done update runs in the background behind the row's own create, so the page does not wait on Airtable
+    check_airtable_writes()
+    pending = st.session_state.get('pending_airtable_rows', [])
+    if any(row['unique_id'] == unique_id for row in pending):
+        # The row is queued for a retry; creating it as Done avoids a duplicate from the upsert
+        st.session_state['pending_airtable_rows'] = [
+            {**row, "Status": "Done"} if row['unique_id'] == unique_id else row for row in pending
+        ]
+        flush_airtable_rows()
+        return
+    creates = [
+        future for future, rows in st.session_state.get('airtable_writes', [])
+        if any(row['unique_id'] == unique_id for row in rows)
+    ]
+    record_id = st.session_state.get('airtable_record_ids', {}).get(unique_id)
+    future = get_background_executor().submit(mark_airtable_done, get_airtable(), unique_id, record_id, creates)
+    st.session_state.setdefault('airtable_writes', []).append((future, []))
 
 def update_airtable(app_name, app_prompt, repo_name_input, unique_id):
     new_row = {
@@ -102,50 +548,48 @@ def update_airtable(app_name, app_prompt, repo_name_input, unique_id):
         "pitch_deck": False,
         "document": False,
     }
-    airtable.create(new_row)
-    st.session_state['uuid'] = unique_id  # Store UUID in session state for fetching download links later
-    st.session_state['app_name'] = app_name
+    queue_airtable_row(new_row)
+
+# Retry rows requeued from failed Airtable writes once per rerun
+flush_airtable_rows()
+
+# Deploy progress for the current code:
+# idle -> code_generated -> repo_created -> provisioned -> workflow_dispatched -> deployed
+st.session_state.setdefault("stage", "idle")
 
 if submitted:
     unique_id = str(uuid.uuid4())
     try:
+        # The Airtable row does not depend on the generated code, so it is saved while the model runs
         if app_type == "Streamlit":
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": f"Generate a Streamlit app for the following idea:\n{app_prompt}. Make sure there are no errors, it has to be modern looking, include relevant icons and add CSS to make it look modern and sleek usable application. If data is needed then, create an input box for the user to enter their own OpenAI API key and use openai.chat.completions.create and gpt-4 model with the structure: response = openai.chat.completions.create(model='gpt-4', messages=[{{'role': 'system', 'content': 'You are a helpful assistant.'}}, {{'role': 'user', 'content': 'give me all the food festivals near '}}]). Use message_content = response.choices[0].message.content.strip() instead of message_content = response.choices[0].message['content'].strip()."}
-                ]
-            )
-            message_content = response.choices[0].message.content.strip()
-            code_block = re.search(r'```python\n(.*?)\n```', message_content, re.DOTALL).group(1)
+            update_airtable(app_name="Streamlit App", app_prompt=app_prompt, repo_name_input="generated-streamlit-app", unique_id=unique_id)
+            code_block = generate_code(app_prompt.strip())  # Surrounding whitespace should not miss the cache
+            # Requirements are worked out once per generation, so deploys never parse the code
+            requirements = build_requirements(code_block)
             st.session_state['code_block'] = code_block  # Store in session state
-            st.code(code_block, language='python')
+            st.session_state['requirements'] = requirements
+            st.session_state.stage = "code_generated"  # New code starts a fresh deploy
+            st.session_state['provision_steps_done'] = set()
+            # Release waits of earlier apps are kept in release_waits and still reported when they finish
+            for key in ('release_failed', 'baseline_version', 'dispatched_at', 'heroku_app_name', 'repo'):
+                st.session_state.pop(key, None)
+            # Only a successful generation replaces the app the download links and webhooks refer to
+            st.session_state['uuid'] = unique_id
+            st.session_state['app_name'] = "Streamlit App"
             st.success("Code generated successfully.")
-            update_airtable(app_name="Streamlit App", app_prompt=app_prompt, repo_name_input="generated-streamlit-app", unique_id=unique_id)
         elif app_type == "React":
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": f"Generate a React app for the following idea:\n{app_prompt}. The code should be structured with multiple pages, and it should be modern looking with relevant icons and CSS to make it look sleek and usable. The code should be delivered in a zip file so that I can run 'npm install' and 'npm run' to start the app."}
-                ]
-            )
-            message_content = response.choices[0].message.content.strip()
-            code_base64 = re.search(r'```base64\n(.*?)\n```', message_content, re.DOTALL).group(1)
-            code_bytes = base64.b64decode(code_base64)
-            zip_filename = "react-app.zip"
-            with open(zip_filename, "wb") as f:
-                f.write(code_bytes)
-            st.success("React app code has been generated and zipped successfully.")
-            with open(zip_filename, "rb") as file:
-                st.download_button(
-                    label="Download React App",
-                    data=file,
-                    file_name=zip_filename,
-                    mime="application/zip"
-                )
             update_airtable(app_name="React App", app_prompt=app_prompt, repo_name_input="generated-react-app", unique_id=unique_id)
+            code_bytes = generate_react_app(app_prompt.strip())
+            st.session_state['uuid'] = unique_id
+            st.session_state['app_name'] = "React App"
+            st.success("React app code has been generated and zipped successfully.")
+            # Served straight from memory; nothing is written to the dyno's disk
+            st.download_button(
+                label="Download React App",
+                data=code_bytes,
+                file_name="react-app.zip",
+                mime="application/zip"
+            )
     except Exception as e:
         st.error(f"Error generating code: {e}")
         print(f"Error generating code: {e}")
@@ -153,259 +597,196 @@ if submitted:
 deploy_button = st.button("Deploy Application")
 
 if deploy_button:
-    if 'code_block' not in st.session_state and app_type == "Streamlit":
+    if st.session_state.stage == "idle" and app_type == "Streamlit":
         st.error("No code to deploy. Please generate the code first.")
     else:
         if app_type == "Streamlit":
             code_block = st.session_state['code_block']  # Retrieve from session state
-            with st.spinner("Creating GitHub repository..."):
-                try:
-                    g = Github(github_token)
-                    user = g.get_user()
-                    repo_name = "generated-streamlit-app"  # Use the user-provided repository name
-
-                    # Check if the repository already exists
-                    repo_exists = any(repo.name == repo_name for repo in user.get_repos())
-                    if repo_exists:
-                        unique_suffix = str(uuid.uuid4())[:8]
-                        repo_name = f"{repo_name}-{unique_suffix}"
-
-                    repo = user.create_repo(repo_name)
-                    st.success(f"GitHub repository '{repo.name}' created successfully.")
-                except Exception as e:
-                    st.error(f"Error creating GitHub repository: {e}")
-                    print(f"Error creating GitHub repository: {e}")
-                    st.stop()
+            if st.session_state.stage == "deployed":
+                app_url = f"https://{st.session_state['heroku_app_name']}.herokuapp.com"
+                st.info(f"This code is already deployed: [Heroku App]({app_url})")
 
-            st.info("Pushing code to GitHub...")
-            try:
-                # Commit the code to the repository
-                repo.create_file("app.py", "initial commit", code_block)
-
-                # Extract imports and generate requirements.txt
-                imports = extract_imports(code_block)
-                requirements = generate_requirements(imports)
-                if 'streamlit' not in requirements:
-                    requirements = 'streamlit\n' + requirements
-                repo.create_file("requirements.txt", "add requirements", requirements)
-
-                # Create and push the Procfile
-                procfile = "web: streamlit run app.py"
-                repo.create_file("Procfile", "add Procfile", procfile)
-
-                # Create and push the setup.sh file
-                setup_sh = """
-                mkdir -p ~/.streamlit/
-                echo "\\
-                [server]\\n\\
-                headless = true\\n\\
-                port = $PORT\\n\\
-                enableCORS = false\\n\\
-                \\n\\
-                " > ~/.streamlit/config.toml
-                chmod +x setup.sh
-                """
-                repo.create_file("setup.sh", "add setup.sh", setup_sh)
-
-                # Create and push the Dockerfile
-                dockerfile = """
-                # Use the official Python image from the Docker Hub
-                FROM python:3.11-slim
-
-                # Set the working directory in the container
-                WORKDIR /app
-
-                # Copy the requirements file into the container
-                COPY requirements.txt .
-
-                # Install the dependencies
-                RUN pip install --no-cache-dir -r requirements.txt
-
-                # Copy the rest of the application code into the container
-                COPY . .
-
-                # Expose the port that Streamlit will run on
-                EXPOSE 8000
-
-                # Add execute permissions to the entrypoint script
-                RUN chmod +x entrypoint.sh
-
-                # Specify the entrypoint script
-                ENTRYPOINT ["./entrypoint.sh"]
-                """
-                repo.create_file("Dockerfile", "add Dockerfile", dockerfile)
-
-                # Create and push the entrypoint.sh file
-                entrypoint_sh = """
-                #!/bin/bash
-                # Set the Streamlit server port to the value of the PORT environment variable
-                export STREAMLIT_SERVER_PORT=${PORT}
-
-                # Run Streamlit with the specified port
-                streamlit run app.py --server.port=${PORT} --server.address=0.0.0.0
-                """
-                repo.create_file("entrypoint.sh", "add entrypoint.sh", entrypoint_sh)
-
-                # Create and push the heroku.yml file
-                heroku_yml = """
-                build:
-                  docker:
-                    web: Dockerfile
-
-                run:
-                  web: ./entrypoint.sh
-                """
-                repo.create_file("heroku.yml", "add heroku.yml", heroku_yml)
-
-                st.success("Code pushed to GitHub successfully!")
-            except Exception as e:
-                st.error(f"Error pushing code to GitHub: {e}")
-                print(f"Error pushing code to GitHub: {e}")
-                st.stop()
-
-            st.info("Creating GitHub secret for Heroku API Key...")
-            try:
-                # Fetch the public key for the repository
-                repo_name = repo.full_name
-                public_key_url = f"https://api.github.com/repos/{repo_name}/actions/secrets/public-key"
-                headers = {"Authorization": f"Bearer {github_token}"}
-                response = requests.get(public_key_url, headers=headers)
-                response.raise_for_status()
-                public_key_data = response.json()
-                public_key = public_key_data["key"]
-                key_id = public_key_data["key_id"]
-
-                # Encrypt the Heroku API key
-                def encrypt_secret(public_key, secret_value):
-                    public_key = nacl.public.PublicKey(public_key.encode("utf-8"), nacl.encoding.Base64Encoder())
-                    sealed_box = nacl.public.SealedBox(public_key)
-                    encrypted = sealed_box.encrypt(secret_value.encode("utf-8"))
-                    return base64.b64encode(encrypted).decode("utf-8")
-
-                encrypted_heroku_api_key = encrypt_secret(public_key, heroku_api_key)
-
-                # Create the secret
-                secret_url = f"https://api.github.com/repos/{repo_name}/actions/secrets/HEROKU_API_KEY"
-                payload = {
-                    "encrypted_value": encrypted_heroku_api_key,
-                    "key_id": key_id
+            # Each stage runs once. A failed stage stops the script and the next click resumes from it.
+            if st.session_state.stage == "code_generated":
+                with st.spinner("Creating GitHub repository..."):
+                    try:
+                        user = get_github().get_user()
+                        # The random suffix makes the name unique, so there is no existence check;
+                        # a collision would surface as a 422 from create_repo
+                        unique_suffix = secrets.token_hex(4)
+                        repo_name = f"generated-streamlit-app-{unique_suffix}"
+
+                        repo = user.create_repo(repo_name, auto_init=True)  # auto_init gives the branch a base commit
+                        st.session_state['repo'] = repo
+                        st.session_state.stage = "repo_created"
+                        st.success(f"GitHub repository '{repo.name}' created successfully.")
+                    except Exception as e:
+                        st.error(f"Error creating GitHub repository: {e}")
+                        print(f"Error creating GitHub repository: {e}")
+                        st.stop()
+
+            repo = st.session_state.get('repo')
+
+            if st.session_state.stage == "repo_created":
+                # The scaffold commit, the Actions secret and the Heroku app only depend on the
+                # repository, so they run concurrently. Steps that already succeeded are skipped.
+                steps_done = st.session_state.setdefault('provision_steps_done', set())
+                deploy_files = build_deploy_files(code_block, st.session_state['requirements'])
+                steps = {
+                    "files": (
+                        "Code pushed to GitHub successfully!",
+                        "Error pushing code to GitHub",
+                        commit_files, (get_github_session(), repo, deploy_files, "initial commit"),
+                    ),
+                    "secrets": (
+                        "GitHub secret for Heroku API Key created successfully!",
+                        "Error creating GitHub secret",
+                        push_secrets, (get_github_session(), repo.full_name, {"HEROKU_API_KEY": heroku_api_key}),
+                    ),
+                    "heroku": (
+                        "Heroku app created successfully",
+                        "Error creating Heroku app",
+                        create_heroku_app, (get_heroku_session(), repo.full_name),
+                    ),
                 }
-                response = requests.put(secret_url, headers=headers, json=payload)
-                response.raise_for_status()
+                with st.spinner("Pushing code, creating the GitHub secret and the Heroku app..."):
+                    with ThreadPoolExecutor(max_workers=len(steps)) as executor:
+                        futures = {
+                            name: executor.submit(step, *args)
+                            for name, (_, _, step, args) in steps.items() if name not in steps_done
+                        }
+                for name, future in futures.items():
+                    success_message, error_message = steps[name][:2]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        st.error(f"{error_message}: {e}")
+                        print(f"{error_message}: {e}")
+                        continue
+                    if name == "heroku":
+                        st.session_state['heroku_app_name'] = result
+                    steps_done.add(name)
+                    st.success(success_message)
+                if len(steps_done) < len(steps):
+                    st.stop()
+                st.session_state.stage = "provisioned"
 
-                st.success("GitHub secret for Heroku API Key created successfully!")
-            except Exception as e:
-                st.error(f"Error creating GitHub secret: {e}")
-                print(f"Error creating GitHub secret: {e}")
-                st.stop()
+            heroku_app_name = st.session_state.get('heroku_app_name')
 
-            with st.spinner("Deploying app to Heroku..."):
+            if st.session_state.stage == "provisioned":
                 try:
-                    # Generate a valid and unique Heroku app name
-                    heroku_app_name_base = re.sub(r'[^a-z0-9-]', '', repo_name.lower())[:20].strip('-')
-                    unique_suffix = str(uuid.uuid4())[:8]
-                    heroku_app_name = f"{heroku_app_name_base}-{unique_suffix}"
-                    headers = {
-                        "Authorization": f"Bearer {heroku_api_key}",
-                        "Accept": "application/vnd.heroku+json; version=3",
-                    }
-                    payload = {
-                        "name": heroku_app_name,
-                        "stack": "container"
-                    }
-                    response = requests.post("https://api.heroku.com/apps", json=payload, headers=headers)
-                    if response.status_code == 201:
-                        st.success("Heroku app created successfully")
-                    else:
-                        st.error(f"Failed to create Heroku app: {response.json()}")
-                        st.stop()
+                    # Creating the app already adds releases; only a newer one is ours
+                    release = latest_heroku_release(get_heroku_session(), heroku_app_name)
+                    st.session_state['baseline_version'] = release["version"] if release else 0
+
+                    # The workflow shipped with the initial commit; pointing it at the app and
+                    # dispatching it replaces a second commit
+                    set_repo_variable(get_github_session(), repo.full_name, "HEROKU_APP_NAME", heroku_app_name)
+                    st.session_state['dispatched_at'] = dispatch_workflow(get_github_session(), repo, "main.yml")
+                    st.session_state.stage = "workflow_dispatched"
                 except Exception as e:
-                    st.error(f"Error creating Heroku app: {e}")
+                    st.error(f"Error deploying to Heroku: {e}")
                     st.stop()
 
-            try:
-                # Create GitHub Action to deploy to Heroku using Docker
-                action_yml = f"""
-                name: Deploy to Heroku
-
-                on:
-                  push:
-                    branches:
-                      - main
-
-                jobs:
-                  build-and-deploy:
-                    runs-on: ubuntu-latest
-
-                    steps:
-                      - name: Checkout code
-                        uses: actions/checkout@v3
-
-                      - name: Set up Docker Buildx
-                        uses: docker/setup-buildx-action@v2
-
-                      - name: Login to Heroku Container Registry
-                        run: echo "${{{{ secrets.HEROKU_API_KEY }}}}" | docker login --username=_ --password-stdin registry.heroku.com
-
-                      - name: Build Docker image
-                        run: docker build -t registry.heroku.com/{heroku_app_name}/web .
-
-                      - name: Push Docker image to Heroku
-                        run: docker push registry.heroku.com/{heroku_app_name}/web
-
-                      - name: Release app
-                        run: |
-                          heroku container:release web --app {heroku_app_name}
-                        env:
-                          HEROKU_API_KEY: ${{{{ secrets.HEROKU_API_KEY }}}}
-                """
-                repo.create_file(".github/workflows/main.yml", "add GitHub Action", action_yml)
-
-                # Push changes to GitHub to trigger the Action
-                repo.update_file("app.py", "deploy to Heroku", code_block, repo.get_contents("app.py").sha)
-                repo.update_file("requirements.txt", "deploy to Heroku", requirements, repo.get_contents("requirements.txt").sha)
-                repo.update_file("Procfile", "deploy to Heroku", procfile, repo.get_contents("Procfile").sha)
-                repo.update_file("setup.sh", "deploy to Heroku", setup_sh, repo.get_contents("setup.sh").sha)
-                repo.update_file("Dockerfile", "deploy to Heroku", dockerfile, repo.get_contents("Dockerfile").sha)
-                repo.update_file("entrypoint.sh", "deploy to Heroku", entrypoint_sh, repo.get_contents("entrypoint.sh").sha)
-                repo.update_file("heroku.yml", "deploy to Heroku", heroku_yml, repo.get_contents("heroku.yml").sha)
-
-                st.info("Waiting for deployment to complete...")
-                time.sleep(60)  # Adjust this delay as needed
-
-                app_url = f"https://{heroku_app_name}.herokuapp.com"
-                st.success(f"Your app has been deployed! You can access it here: [Heroku App]({app_url})")
-
-                # Update Airtable Status to Done
-                if 'uuid' in st.session_state:
-                    airtable_record_id = st.session_state['uuid']
-                    try:
-                        record = airtable.first(formula=f"{{unique_id}}='{airtable_record_id}'")
-                        if record:
-                            record_id = record['id']
-                            airtable.update(record_id, {"Status": "Done"})
-                            st.success("Airtable status updated to Done.")
-                    except Exception as e:
-                        st.error(f"Error updating Airtable status: {e}")
-
-            except Exception as e:
-                st.error(f"Error deploying to Heroku: {e}")
+            release_waits = st.session_state.setdefault('release_waits', {})
+            if st.session_state.stage == "workflow_dispatched" and st.session_state['uuid'] not in release_waits:
+                try:
+                    if st.session_state.get('release_failed'):
+                        # Re-run the workflow already in the repository instead of pushing new commits
+                        release = latest_heroku_release(get_heroku_session(), heroku_app_name)
+                        st.session_state['baseline_version'] = release["version"] if release else 0
+                        st.session_state['dispatched_at'] = dispatch_workflow(get_github_session(), repo, "main.yml")
+                        st.session_state['release_failed'] = False
+
+                    # The wait runs in the background so the page stays usable during the build.
+                    # It is keyed by the app's uuid and keeps its own deploy details, so generating
+                    # new code while it runs does not lose it.
+                    release_waits[st.session_state['uuid']] = {
+                        "future": get_release_executor().submit(
+                            wait_for_heroku_release, get_heroku_session(), get_github_session(),
+                            heroku_app_name, st.session_state['baseline_version'],
+                            repo.full_name, st.session_state['dispatched_at'],
+                        ),
+                        "app_name": heroku_app_name,
+                        "repo_url": repo.html_url,
+                        "uuid": st.session_state['uuid'],
+                    }
+                except Exception as e:
+                    st.error(f"Error deploying to Heroku: {e}")
+
+@st.fragment(run_every=5)
+def watch_releases(futures):
+    # Rerun the page once one of the background release waits finishes
+    if any(future.done() for future in futures):
+        st.rerun()
+
+# Every rerun checks on the release waits started by the deploy button, including those of earlier apps
+release_waits = st.session_state.get('release_waits', {})
+running_waits = [release_wait["future"] for release_wait in release_waits.values() if not release_wait["future"].done()]
+if running_waits:
+    st.info("Waiting for deployment to complete...")
+    watch_releases(running_waits)
+
+for unique_id, release_wait in list(release_waits.items()):
+    release_future = release_wait["future"]
+    if not release_future.done():
+        continue
+    del release_waits[unique_id]
+    # Only the wait for the current app moves its deploy stage; earlier apps are just reported
+    is_current = unique_id == st.session_state.get('uuid')
+    app_url = f"https://{release_wait['app_name']}.herokuapp.com"
+    actions_url = f"{release_wait['repo_url']}/actions"
+    try:
+        release_status = release_future.result()
+        if release_status == "succeeded":
+            if is_current:
+                st.session_state.stage = "deployed"
+            st.success(f"Your app has been deployed! You can access it here: [Heroku App]({app_url})")
+        elif release_status == "failed":
+            if is_current:
+                st.session_state['release_failed'] = True
+                st.error(f"Heroku release failed. Check the GitHub Actions run in {actions_url}, then click Deploy Application to retry.")
+            else:
+                st.error(f"Heroku release of {app_url} failed. Check the GitHub Actions run in {actions_url}.")
+        else:
+            # A timed-out wait is retried like a failure, so the next click dispatches again
+            if is_current:
+                st.session_state['release_failed'] = True
+                st.warning(f"Deployment did not finish in time. Check the GitHub Actions run in {actions_url}; your app will be at [Heroku App]({app_url}) once it finishes, or click Deploy Application to retry.")
+            else:
+                st.warning(f"Deployment did not finish in time. Check the GitHub Actions run in {actions_url}; your app will be at [Heroku App]({app_url}) once it finishes.")
+
+        # Update Airtable Status to Done
+        if release_status == "succeeded":
+            queue_airtable_done(unique_id)
+    except Exception as e:
+        st.error(f"Error deploying to Heroku: {e}")
 
 # Create functions to provide download links for the generated pitch deck and document
+# Reruns within 30 seconds reuse the last lookup instead of querying Airtable again
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_airtable_record(uuid, record_id=None):
+    # Read the row by id when we have it; otherwise let Airtable filter by unique_id
+    if record_id:
+        return get_airtable().get(record_id)
+    return get_airtable().first(formula=f"{{unique_id}}='{uuid}'")
+
 def get_download_links(uuid):
     try:
-        airtable_records = airtable.all()
-        for record in airtable_records:
-            fields = record['fields']
-            if fields.get('unique_id') == uuid:
-                pitch_deck_url = fields.get('pitch_deck_url')
-                document_url = fields.get('document_url')
-                if pitch_deck_url:
-                    st.markdown(f"[Download Pitch Deck]({pitch_deck_url})")
-                if document_url:
-                    st.markdown(f"[Download Business Plan]({document_url})")
-                return
-        st.info("No matching record found in Airtable.")
+        # The row may still be on its way to Airtable; the links come later anyway
+        if not check_airtable_writes():
+            return
+        record = fetch_airtable_record(uuid, st.session_state.get('airtable_record_ids', {}).get(uuid))
+        if not record:
+            st.info("No matching record found in Airtable.")
+            return
+        fields = record['fields']
+        pitch_deck_url = fields.get('pitch_deck_url')
+        document_url = fields.get('document_url')
+        if pitch_deck_url:
+            st.markdown(f"[Download Pitch Deck]({pitch_deck_url})")
+        if document_url:
+            st.markdown(f"[Download Business Plan]({document_url})")
     except Exception as e:
         st.error(f"Error fetching download links: {e}")
 
@@ -430,6 +811,20 @@ with col2:
     st.subheader("Business Plan")
     generate_document_button = st.button("Generate Business Plan")
 
+def post_make_webhook(session, payload):
+    response = session.post(make_webhook_url, json=payload, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+
+def trigger_make_webhook(payload):
+    # Repeat clicks with the same payload would start a duplicate job, so each one is sent once per session.
+    # Make only has to accept the request, so the POST runs in the background; the entry becomes None once reported.
+    key = tuple(payload.values())
+    sent = st.session_state.setdefault('sent_webhooks', {})
+    if key in sent:
+        return False
+    sent[key] = get_background_executor().submit(post_make_webhook, get_http_session(), payload)
+    return True
+
 if generate_pitch_deck_button:
     st.write("Generating Pitch Deck...")
     if 'uuid' not in st.session_state:
@@ -442,9 +837,10 @@ if generate_pitch_deck_button:
                 "pitch_deck": True,
                 "document": False,
             }
-            response = requests.post(make_webhook_url, json=payload)
-            response.raise_for_status()
-            notification.success("Pitch Deck generation triggered successfully.")
+            if trigger_make_webhook(payload):
+                notification.info("Pitch Deck generation queued.")
+            else:
+                notification.info("Pitch Deck generation was already triggered for this app.")
         except Exception as e:
             notification.error(f"Error triggering Pitch Deck generation: {e}")
 
@@ -460,8 +856,31 @@ if generate_document_button:
                 "pitch_deck": False,
                 "document": True,
             }
-            response = requests.post(make_webhook_url, json=payload)
-            response.raise_for_status()
-            notification.success("Business Plan generation triggered successfully.")
+            if trigger_make_webhook(payload):
+                notification.info("Business Plan generation queued.")
+            else:
+                notification.info("Business Plan generation was already triggered for this app.")
         except Exception as e:
             notification.error(f"Error triggering Business Plan generation: {e}")
+
+@st.fragment(run_every=5)
+def watch_webhooks(futures):
+    # Rerun the page once a queued webhook post finishes, so its outcome is reported below
+    if any(future.done() for future in futures):
+        st.rerun()
+
+# Report webhook posts that finished since the last rerun; forgetting failed ones lets the button retry
+sent_webhooks = st.session_state.get('sent_webhooks', {})
+for key, future in list(sent_webhooks.items()):
+    if future is None or not future.done():
+        continue
+    if future.exception():
+        notification.error(f"Error triggering generation: {future.exception()}")
+        del sent_webhooks[key]
+    else:
+        notification.success("Generation triggered successfully.")
+        sent_webhooks[key] = None
+
+running_webhooks = [future for future in sent_webhooks.values() if future is not None and not future.done()]
+if running_webhooks:
+    watch_webhooks(running_webhooks)
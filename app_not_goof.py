@@ -113,17 +113,21 @@ def update_status(task, status):
     status_messages[task] = status
     display_status()
 
+# Status pane is a single sidebar slot that each update overwrites instead of appending to
+status_slot = st.sidebar.empty()
+
 # Function to display status
 def display_status():
-    st.sidebar.markdown("### Status Pane")
+    lines = ["### Status Pane"]
     for task, status in status_messages.items():
         status_text = f"{task} - {status.capitalize()}"
         if status == "completed":
-            st.sidebar.markdown(f"<div class='completed'>{status_text}</div>", unsafe_allow_html=True)
+            lines.append(f"<div class='completed'>{status_text}</div>")
         elif status == "in progress":
-            st.sidebar.markdown(f"<div class='in-progress'>{status_text}</div>", unsafe_allow_html=True)
+            lines.append(f"<div class='in-progress'>{status_text}</div>")
         else:
-            st.sidebar.markdown(f"<div class='pending'>{status_text}</div>", unsafe_allow_html=True)
+            lines.append(f"<div class='pending'>{status_text}</div>")
+    status_slot.markdown("\n".join(lines), unsafe_allow_html=True)
 
 display_status()
 
@@ -232,7 +236,6 @@ if deploy_button:
         st.info("Pushing code to GitHub...")
         try:
             update_status("GitHub Repo Creation", "in progress")
-            display_status()
             # Commit the code to the repository
             repo.create_file("app.py", "initial commit", code_block)
             print("app.py pushed to GitHub.")
@@ -328,7 +331,6 @@ if deploy_button:
         st.info("Creating GitHub secret for Heroku API Key...")
         try:
             update_status("Heroku Deployment", "in progress")
-            display_status()
             # Fetch the public key for the repository
             repo_name = repo.full_name
             public_key_url = f"https://api.github.com/repos/{repo_name}/actions/secrets/public-key"
@@ -367,7 +369,6 @@ if deploy_button:
         with st.spinner("Deploying app to Heroku..."):
             try:
                 update_status("Heroku Deployment", "in progress")
-                display_status()
                 # Generate a valid and unique Heroku app name
                 heroku_app_name_base = re.sub(r'[^a-z0-9-]', '', repo_name.lower())[:20].strip('-')
                 unique_suffix = str(uuid.uuid4())[:8]
@@ -96,19 +96,25 @@ def generate_requirements(imports):
     }
     return "\n".join([base_requirements.get(lib, lib) for lib in imports if lib in base_requirements])
 
+def status_line(key, value):
+    if value == "completed":
+        return f"✅ {key}"
+    elif value == "in progress":
+        return f"⏳ {key}"
+    return f"🔲 {key}"
+
+# One sidebar slot per status line, so an update redraws only the line that changed
+st.sidebar.markdown("### Status")
+status_slots = {key: st.sidebar.empty() for key in status_dict}
+
 def update_status(key, status):
     status_dict[key] = status
     st.session_state.status_dict = status_dict
+    status_slots[key].markdown(status_line(key, status))
 
 def display_status():
-    st.sidebar.markdown("### Status")
     for key, value in status_dict.items():
-        if value == "completed":
-            st.sidebar.markdown(f"✅ {key}")
-        elif value == "in progress":
-            st.sidebar.markdown(f"⏳ {key}")
-        else:
-            st.sidebar.markdown(f"🔲 {key}")
+        status_slots[key].markdown(status_line(key, value))
 
 if 'status_dict' not in st.session_state:
     st.session_state.status_dict = status_dict
@@ -118,7 +124,6 @@ display_status()
 if submitted:
     # Step 1: Generate code using OpenAI API
     update_status("Code Generation", "in progress")
-    display_status()
     with st.spinner("Generating code..."):
         try:
             response = client.chat.completions.create(
@@ -172,7 +177,6 @@ if deploy_button:
         with st.spinner("Creating GitHub repository..."):
             try:
                 update_status("GitHub Repository", "in progress")
-                display_status()
                 g = Github(github_token)
                 user = g.get_user()
                 repo_name = repo_name_input  # Use the user-provided repository name
@@ -316,7 +320,6 @@ if deploy_button:
         with st.spinner("Deploying app to Heroku..."):
             try:
                 update_status("Heroku Deployment", "in progress")
-                display_status()
                 # Generate a valid and unique Heroku app name
                 heroku_app_name_base = re.sub(r'[^a-z0-9-]', '', repo_name.lower())[:20].strip('-')
                 unique_suffix = str(uuid.uuid4())[:8]
@@ -404,7 +407,6 @@ if deploy_button:
                 except Exception as e:
                     st.error(f"Error updating Airtable status: {e}")
             update_status("Heroku Deployment", "completed")
-            display_status()
 
         except Exception as e:
             st.error(f"Error deploying to Heroku: {e}")